@@ -0,0 +1,109 @@
+# app/circuit_breaker.py
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker.
+
+    Opens after `failure_threshold` failures within `window` seconds, fails fast
+    for `cooldown` seconds, then lets up to `half_open_max` trial calls through.
+    A successful trial closes the breaker; a failed trial re-opens it.
+    Callers must report every allowed call via record_success/record_failure,
+    passing the token allow() returned.
+
+    Tokens carry the breaker's generation, which advances whenever it opens
+    or closes. Calls admitted before a transition report with an old token
+    and are ignored, so a slow call started while closed cannot close (or
+    re-open) a half-open breaker ahead of its trial.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, window: float = 120.0,
+                 cooldown: float = 60.0, half_open_max: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.half_open_max = half_open_max
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._generation = 1
+        self._failures = deque()
+        self._opened_at = 0.0
+        self._trials_in_flight = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._trials_in_flight = 0
+            logger.info(f"🔶 Circuit '{self.name}' half-open, allowing trial requests")
+
+    def _trip(self):
+        self._state = OPEN
+        self._generation += 1
+        self._opened_at = time.monotonic()
+        self._trials_in_flight = 0
+        logger.warning(f"🔴 Circuit '{self.name}' opened for {self.cooldown:.0f}s")
+
+    def allow(self):
+        """Return a token for record_success/record_failure, or None to fail fast."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return self._generation
+            if self._state == HALF_OPEN and self._trials_in_flight < self.half_open_max:
+                self._trials_in_flight += 1
+                return self._generation
+            return None
+
+    def record_success(self, token: int):
+        with self._lock:
+            if token != self._generation:
+                return
+            if self._state == HALF_OPEN:
+                logger.info(f"🟢 Circuit '{self.name}' closed after successful trial")
+                self._state = CLOSED
+                self._generation += 1
+                self._trials_in_flight = 0
+            self._failures.clear()
+
+    def record_failure(self, token: int):
+        with self._lock:
+            if token != self._generation:
+                return
+            if self._state == HALF_OPEN:
+                self._trip()
+                return
+
+            now = time.monotonic()
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self.window:
+                self._failures.popleft()
+            if len(self._failures) >= self.failure_threshold:
+                self._failures.clear()
+                self._trip()
+
+    def snapshot(self) -> dict:
+        """Current state for health/diagnostic endpoints."""
+        with self._lock:
+            self._maybe_half_open()
+            info = {"state": self._state, "recent_failures": len(self._failures)}
+            if self._state == OPEN:
+                info["retry_in_s"] = round(max(0.0, self.cooldown - (time.monotonic() - self._opened_at)), 1)
+            return info
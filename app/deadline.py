@@ -0,0 +1,54 @@
+# app/deadline.py
+import time
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's time budget runs out."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        super().__init__(f"Deadline exceeded during {stage}")
+
+
+class Deadline:
+    """
+    End-to-end time budget for one request.
+
+    Created once per webhook call and handed to every stage (login, navigation,
+    search, extraction, send). Each stage calls enter() so a timeout can report
+    where it happened, and sizes its waits with timeout_ms() so no single
+    action can outlive the remaining budget.
+    """
+
+    def __init__(self, seconds: float, stage: str = "start"):
+        self.expires_at = time.monotonic() + seconds
+        self.stage = stage
+
+    def remaining(self) -> float:
+        """Seconds left, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def enter(self, stage: str) -> float:
+        """Mark the start of a stage and return its remaining budget in seconds."""
+        self.stage = stage
+        self.check()
+        return self.remaining()
+
+    def check(self):
+        if self.expired:
+            raise DeadlineExceeded(self.stage)
+
+    def timeout_ms(self, cap_ms: float) -> int:
+        """A Playwright-style timeout: cap_ms trimmed to the remaining budget."""
+        self.check()
+        return max(1, int(min(cap_ms, self.remaining() * 1000)))
+
+    def sub(self, reserve: float) -> "Deadline":
+        """A child deadline ending `reserve` seconds earlier, e.g. to keep time for the reply."""
+        child = Deadline(0, stage=self.stage)
+        child.expires_at = self.expires_at - reserve
+        return child
@@ -0,0 +1,411 @@
+# app/loadgen.py
+"""
+Webhook traffic recorder, synthesizer and replay tool.
+
+Reproduces production bursts (shift-end Job ID floods, group forwards)
+against main.webhook, either over HTTP or through the Flask test client.
+
+Usage:
+    python -m app.loadgen synthesize corpus.jsonl --count 500 --burst 60
+    python -m app.loadgen replay corpus.jsonl --target flask --rate 20 --concurrency 8
+    python -m app.loadgen replay corpus.jsonl --target http://localhost:8000/webhook
+    python -m app.loadgen serve --port 8000   # main.app with stubbed scraper/Twilio
+
+Set WEBHOOK_RECORD_PATH on a running instance to capture real traffic.
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import tempfile
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_RECORD_PATH = os.getenv("WEBHOOK_RECORD_PATH")
+RECORDED_FIELDS = ("From", "Body", "MessageSid")
+# main.webhook answers 200 even when it failed; these statuses count as errors
+ERROR_STATUSES = ("error", "job_lookup_timed_out", "job_lookup_unavailable")
+
+_record_lock = threading.Lock()
+
+GENERAL_QUERIES = [
+    "What day is today?",
+    "help",
+    "hi",
+    "what time is it",
+    "thanks",
+]
+
+# -----------------------------------------
+# Recording
+# -----------------------------------------
+def record_webhook(form, path: str = None):
+    """
+    Append a Twilio-shaped form post to the JSONL corpus.
+    No-op unless a path is given or WEBHOOK_RECORD_PATH is set.
+    The corpus holds real phone numbers and message bodies: keep it private.
+    """
+    path = path or WEBHOOK_RECORD_PATH
+    if not path:
+        return
+
+    entry = {
+        "ts": time.time(),
+        "form": {field: form.get(field, "") for field in RECORDED_FIELDS},
+    }
+    try:
+        with _record_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        logger.error(f"Failed to record webhook request: {e}")
+
+
+def load_corpus(path: str) -> list[dict]:
+    """Load a JSONL corpus, sorted by timestamp."""
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    entries.sort(key=lambda e: e.get("ts", 0))
+    return entries
+
+
+# -----------------------------------------
+# Synthesis
+# -----------------------------------------
+def _random_job_id(rng: random.Random) -> str:
+    return "1000" + "".join(rng.choice("0123456789") for _ in range(16))
+
+
+def synthesize_corpus(count: int = 200, senders: int = 20, burst_seconds: float = 60.0,
+                      job_ratio: float = 0.7, forward_ratio: float = 0.2,
+                      seed: int = None) -> list[dict]:
+    """
+    Generate a shift-end style burst: `count` messages from `senders` technicians
+    spread over `burst_seconds`, front-loaded so most arrive early in the window.
+    The remainder after Job IDs and group forwards are general queries.
+    """
+    rng = random.Random(seed)
+    numbers = [f"whatsapp:+1555{rng.randint(1000000, 9999999)}" for _ in range(senders)]
+    job_ids = [_random_job_id(rng) for _ in range(max(1, count // 3))]
+    start = time.time()
+
+    entries = []
+    for i in range(count):
+        roll = rng.random()
+        job_id = rng.choice(job_ids)
+        if roll < job_ratio:
+            body = job_id
+        elif roll < job_ratio + forward_ratio:
+            body = f"Forwarded from team group: {job_id} closed out, pls check"
+        else:
+            body = rng.choice(GENERAL_QUERIES)
+
+        # Squared uniform → arrivals bunch up at the start of the window
+        offset = (rng.random() ** 2) * burst_seconds
+        entries.append({
+            "ts": start + offset,
+            "form": {
+                "From": rng.choice(numbers),
+                "Body": body,
+                "MessageSid": f"SM{rng.getrandbits(128):032x}",
+            },
+        })
+
+    entries.sort(key=lambda e: e["ts"])
+    return entries
+
+
+def write_corpus(entries: list[dict], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+# -----------------------------------------
+# Local stubs for the scraper and Twilio
+# -----------------------------------------
+def make_stub_search(min_latency: float = 0.5, max_latency: float = 2.0, not_found_ratio: float = 0.1):
+    """Build a playwright_search replacement that sleeps instead of driving Chromium."""
+    rng = random.Random()
+
+    def stub_playwright_search(job_id: str, headless=True, timeout=60000, **kwargs) -> dict:
+        time.sleep(rng.uniform(min_latency, max_latency))
+        if rng.random() < not_found_ratio:
+            return {"success": False, "job_id": job_id, "message": f"Job ID {job_id} not found"}
+        return {
+            "success": True,
+            "job_id": job_id,
+            "message": f"Job ID {job_id} found successfully",
+            "overall_status": rng.choice(["PASS", "FAIL"]),
+            "account": "8245100000000000",
+            "cable_type": "RG6",
+            "date_uploaded": "2026-01-01 17:45",
+            "test_type": "Install",
+            "date_measured": "2026-01-01 17:30",
+            "test_set": "Load Test Co",
+            "technician": "Load Tester",
+            "component_status": {"tap": "✅ Passed", "Cpe": "➖ Missing", "TDR": "➖ Missing"},
+        }
+
+    return stub_playwright_search
+
+
+def make_stub_send(latency: float = 0.05):
+    """Build a send_whatsapp_message replacement that never calls Twilio."""
+    def stub_send_whatsapp_message(to_number: str, body: str, max_retries: int = 3, **kwargs):
+        time.sleep(latency)
+        return f"SMstub{random.getrandbits(64):016x}"
+
+    return stub_send_whatsapp_message
+
+
+def install_stubs(search_latency=(0.5, 2.0), send_latency: float = 0.05):
+    """
+    Swap the scraper, Twilio and watch-store hooks in main and app.watch for
+    local stubs. Watch subscriptions go to a throwaway temp directory.
+    Returns the main module.
+    """
+    import main
+    from app import watch
+
+    stub_search = make_stub_search(*search_latency)
+    stub_send = make_stub_send(send_latency)
+    main.playwright_search = stub_search
+    main.send_whatsapp_message = stub_send
+    watch.send_whatsapp_message = stub_send
+    watch.batch_search = lambda job_ids, **kwargs: {job_id: stub_search(job_id) for job_id in job_ids}
+    watch.subscription_store.path = os.path.join(tempfile.mkdtemp(prefix="loadgen-watch-"), "watch_subscriptions.json")
+    logger.info("Load-test stubs installed for scraper, Twilio and watch store")
+    return main
+
+
+# -----------------------------------------
+# Targets
+# -----------------------------------------
+class HttpTarget:
+    """POST form data to a running instance."""
+
+    def __init__(self, url: str, timeout: float = 180.0):
+        import requests
+        self.url = url
+        self.timeout = timeout
+        self._requests = requests
+
+    def post(self, form: dict) -> tuple[int, str]:
+        resp = self._requests.post(self.url, data=form, timeout=self.timeout)
+        return resp.status_code, resp.text
+
+
+class FlaskTarget:
+    """POST form data through the Flask test client of main.app (in-process)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def post(self, form: dict) -> tuple[int, str]:
+        with self.app.test_client() as client:
+            resp = client.post("/webhook", data=form)
+            return resp.status_code, resp.get_data(as_text=True)
+
+
+# -----------------------------------------
+# Replay
+# -----------------------------------------
+def replay(entries: list[dict], target, rate: float = None, speed: float = 1.0,
+           concurrency: int = 4) -> list[dict]:
+    """
+    Replay corpus entries against a target.
+
+    With `rate` set, requests are scheduled at a fixed requests/second;
+    otherwise recorded inter-arrival times are kept, divided by `speed`.
+    Each result records scheduled/start/end times so queueing delay
+    (start - scheduled) is separated from service latency (end - start).
+    """
+    if not entries:
+        return []
+
+    first_ts = entries[0].get("ts", 0)
+    offsets = []
+    for i, entry in enumerate(entries):
+        if rate:
+            offsets.append(i / rate)
+        else:
+            offsets.append((entry.get("ts", first_ts) - first_ts) / speed)
+
+    results = [None] * len(entries)
+    t0 = time.perf_counter()
+
+    def run(i):
+        started = time.perf_counter()
+        result = {"scheduled": offsets[i], "start": started - t0}
+        try:
+            status_code, text = target.post(entries[i]["form"])
+            result["status_code"] = status_code
+            try:
+                result["status"] = json.loads(text).get("status")
+            except (ValueError, AttributeError):
+                result["status"] = None
+            if not 200 <= status_code < 300:
+                result["error"] = f"HTTP {status_code}"
+            elif result["status"] in ERROR_STATUSES:
+                result["error"] = f"status {result['status']}"
+            else:
+                result["error"] = None
+        except Exception as e:
+            result["status_code"] = None
+            result["status"] = None
+            result["error"] = str(e)
+        result["end"] = time.perf_counter() - t0
+        results[i] = result
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, offset in enumerate(offsets):
+            delay = offset - (time.perf_counter() - t0)
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, i)
+
+    return results
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(results: list[dict]) -> dict:
+    """Aggregate replay results into throughput, latency, error and queueing figures."""
+    results = [r for r in results if r]
+    if not results:
+        return {"requests": 0}
+
+    latencies = [r["end"] - r["start"] for r in results]
+    queue_delays = [max(0.0, r["start"] - r["scheduled"]) for r in results]
+    wall = max(r["end"] for r in results) - min(r["start"] for r in results)
+    errors = [r for r in results if r["error"]]
+
+    statuses = {}
+    for r in results:
+        key = r["status"] or "unknown"
+        statuses[key] = statuses.get(key, 0) + 1
+
+    def dist(values):
+        return {
+            "p50": round(_percentile(values, 50), 4),
+            "p90": round(_percentile(values, 90), 4),
+            "p95": round(_percentile(values, 95), 4),
+            "p99": round(_percentile(values, 99), 4),
+            "max": round(max(values), 4),
+        }
+
+    return {
+        "requests": len(results),
+        "duration_s": round(wall, 3),
+        "throughput_rps": round(len(results) / wall, 3) if wall > 0 else None,
+        "error_rate": round(len(errors) / len(results), 4),
+        "errors": len(errors),
+        "latency_s": dist(latencies),
+        "queue_delay_s": dist(queue_delays),
+        "statuses": statuses,
+    }
+
+
+def format_report(summary: dict) -> str:
+    if not summary.get("requests"):
+        return "No requests replayed."
+    lat = summary["latency_s"]
+    q = summary["queue_delay_s"]
+    lines = [
+        f"Requests:    {summary['requests']} in {summary['duration_s']}s",
+        f"Throughput:  {summary['throughput_rps']} req/s",
+        f"Errors:      {summary['errors']} ({summary['error_rate'] * 100:.2f}%)",
+        f"Latency:     p50={lat['p50']}s p90={lat['p90']}s p95={lat['p95']}s p99={lat['p99']}s max={lat['max']}s",
+        f"Queue delay: p50={q['p50']}s p90={q['p90']}s p95={q['p95']}s p99={q['p99']}s max={q['max']}s",
+        "Statuses:    " + ", ".join(f"{k}={v}" for k, v in sorted(summary["statuses"].items())),
+    ]
+    return "\n".join(lines)
+
+
+# -----------------------------------------
+# CLI
+# -----------------------------------------
+def _parse_latency(value: str) -> tuple[float, float]:
+    parts = [float(p) for p in value.split(",")]
+    return (parts[0], parts[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.loadgen", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    syn = sub.add_parser("synthesize", help="Generate a synthetic burst corpus")
+    syn.add_argument("output")
+    syn.add_argument("--count", type=int, default=200)
+    syn.add_argument("--senders", type=int, default=20)
+    syn.add_argument("--burst", type=float, default=60.0, help="Burst window in seconds")
+    syn.add_argument("--job-ratio", type=float, default=0.7)
+    syn.add_argument("--forward-ratio", type=float, default=0.2)
+    syn.add_argument("--seed", type=int)
+
+    rep = sub.add_parser("replay", help="Replay a corpus and report")
+    rep.add_argument("corpus")
+    rep.add_argument("--target", default="flask", help="'flask' for in-process, or a webhook URL")
+    rep.add_argument("--rate", type=float, help="Fixed requests/second (default: recorded timing)")
+    rep.add_argument("--speed", type=float, default=1.0, help="Time compression for recorded timing")
+    rep.add_argument("--concurrency", type=int, default=4)
+    rep.add_argument("--search-latency", type=_parse_latency, default=(0.5, 2.0),
+                     help="Stub scraper latency range 'min,max' in seconds (flask target)")
+    rep.add_argument("--no-stubs", action="store_true", help="Use the real scraper/Twilio (flask target)")
+    rep.add_argument("--json", action="store_true", help="Print the summary as JSON")
+
+    srv = sub.add_parser("serve", help="Run main.app with stubbed scraper and Twilio")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=8000)
+    srv.add_argument("--search-latency", type=_parse_latency, default=(0.5, 2.0))
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.command == "synthesize":
+        entries = synthesize_corpus(args.count, args.senders, args.burst,
+                                    args.job_ratio, args.forward_ratio, args.seed)
+        write_corpus(entries, args.output)
+        print(f"Wrote {len(entries)} requests to {args.output}")
+        return 0
+
+    if args.command == "serve":
+        main_module = install_stubs(args.search_latency)
+        main_module.app.run(host=args.host, port=args.port, threaded=True)
+        return 0
+
+    entries = load_corpus(args.corpus)
+    if args.target == "flask":
+        if args.no_stubs:
+            import main as main_module
+        else:
+            main_module = install_stubs(args.search_latency)
+        target = FlaskTarget(main_module.app)
+    else:
+        target = HttpTarget(args.target)
+
+    results = replay(entries, target, rate=args.rate, speed=args.speed, concurrency=args.concurrency)
+    summary = summarize(results)
+    print(json.dumps(summary, indent=2) if args.json else format_report(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# app/profiler.py
+"""
+In-process sampling profiler producing flamegraph collapsed stacks
+("root;caller;leaf count" per line, as read by flamegraph.pl / speedscope).
+
+Only the current process is sampled; main.py refuses to profile under
+multiple worker processes (see require_single_process).
+
+Playwright's sync API waits by switching to its dispatcher greenlet, and
+sys._current_frames() only shows the running greenlet. For threads that
+expose their caller greenlet as `thread.greenlet` (portal sessions), a
+sample taken inside the dispatcher is stacked on top of the suspended
+caller's frames under a "[playwright wait]" marker, so waits are charged
+to the _search_on_page line that made them.
+"""
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 0.005
+SESSION_THREAD_PREFIX = "veex-session"
+GREENLET_SWITCH_LABEL = "[playwright wait]"
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _walk(frame) -> tuple[list[str], object]:
+    """Frame labels root first, plus the root frame itself."""
+    labels, root = [], None
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        root, frame = frame, frame.f_back
+    return labels[::-1], root
+
+
+def _thread_stack(thread, frame) -> list[str]:
+    stack, root = _walk(frame)
+    caller = getattr(thread, "greenlet", None)
+    # gr_frame is None while the caller greenlet is the one running
+    suspended = caller.gr_frame if caller is not None else None
+    if suspended is not None:
+        caller_stack, caller_root = _walk(suspended)
+        if caller_root is not root:
+            return caller_stack + [GREENLET_SWITCH_LABEL] + stack
+    return stack
+
+
+def collapse(counts: Counter) -> str:
+    """Render stack counts in collapsed-stack format, hottest first."""
+    return "\n".join(f"{stack} {count}" for stack, count in counts.most_common())
+
+
+class SamplingProfiler:
+    """
+    Samples every thread's Python stack (sys._current_frames) on a background
+    thread. `thread_filter(thread)` can restrict which threads are recorded.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, thread_filter=None):
+        self.interval = interval
+        self.thread_filter = thread_filter
+        self.counts = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.counts
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.is_set():
+            threads = {t.ident: t for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                thread = threads.get(thread_id)
+                if self.thread_filter and (thread is None or not self.thread_filter(thread)):
+                    continue
+
+                stack = _thread_stack(thread, frame)
+                name = thread.name if thread else f"thread-{thread_id}"
+                self.counts[";".join([name] + stack)] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+
+def profile_for(seconds: float, interval: float = DEFAULT_INTERVAL) -> str:
+    """Sample the whole process for `seconds` and return collapsed stacks."""
+    logger.info(f"🔬 Profiling process for {seconds:.1f}s")
+    profiler = SamplingProfiler(interval=interval).start()
+    time.sleep(seconds)
+    return collapse(profiler.stop())
+
+
+class RequestProfiler:
+    """
+    Profiles the next K webhook requests end to end.
+
+    While an armed request is in flight its handler thread and the portal
+    session threads (which do the Playwright work for it) are sampled;
+    stacks from all K requests are merged into one collapsed output.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.remaining = 0
+        self.active = 0
+        self.completed = 0
+        self.interval = DEFAULT_INTERVAL
+        self.counts = Counter()
+
+    def arm(self, count: int, interval: float = DEFAULT_INTERVAL) -> bool:
+        """Start a new run; False while requests from the previous run are still in flight."""
+        with self._lock:
+            if self.active:
+                return False
+            self.remaining = count
+            self.completed = 0
+            self.interval = interval
+            self.counts = Counter()
+        logger.info(f"🔬 Profiling the next {count} webhook requests")
+        return True
+
+    def begin(self):
+        """Called at request start; returns a token for end(), or None if not armed."""
+        with self._lock:
+            if self.remaining <= 0:
+                return None
+            self.remaining -= 1
+            self.active += 1
+            interval = self.interval
+
+        request_thread = threading.get_ident()
+        return SamplingProfiler(
+            interval=interval,
+            thread_filter=lambda t: t.ident == request_thread or t.name.startswith(SESSION_THREAD_PREFIX),
+        ).start()
+
+    def end(self, token):
+        if token is None:
+            return
+        counts = token.stop()
+        with self._lock:
+            self.counts.update(counts)
+            self.active -= 1
+            self.completed += 1
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "remaining": self.remaining,
+                "active": self.active,
+                "completed": self.completed,
+                "stacks": len(self.counts),
+                "done": self.remaining == 0 and self.active == 0 and self.completed > 0,
+            }
+
+    def output(self) -> str:
+        with self._lock:
+            return collapse(self.counts)
+
+
+request_profiler = RequestProfiler()
@@ -1,9 +1,19 @@
 import os
 import time
+import copy
 import logging
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from datetime import datetime
 from urllib.parse import unquote
 from dotenv import load_dotenv
+from greenlet import getcurrent as current_greenlet
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+from app.circuit_breaker import CircuitBreaker
+from app.deadline import Deadline, DeadlineExceeded
+from app.selector_cache import SelectorResolver
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -20,408 +30,841 @@ VEEX_PASSWORD = unquote(os.getenv("VEEX_PASSWORD", "")) if os.getenv("VEEX_PASSW
 
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 
+# Circuit breaker: open after N portal failures within the window, retry after cooldown
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("VEEX_BREAKER_FAILURES", "3"))
+BREAKER_WINDOW_SECONDS = float(os.getenv("VEEX_BREAKER_WINDOW", "300"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("VEEX_BREAKER_COOLDOWN", "120"))
+STALE_CACHE_MAX = int(os.getenv("VEEX_STALE_CACHE_MAX", "500"))
+
+# Total budget for a lookup when the caller does not pass its own deadline
+LOOKUP_DEADLINE_SECONDS = float(os.getenv("VEEX_LOOKUP_DEADLINE", "90"))
+# How often background (watch) lookups re-check for an idle session
+BACKGROUND_IDLE_POLL_SECONDS = 2.0
+
+portal_breaker = CircuitBreaker(
+    "veex_portal",
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    window=BREAKER_WINDOW_SECONDS,
+    cooldown=BREAKER_COOLDOWN_SECONDS,
+)
+
+# Winning selector per login/search step, persisted to SELECTOR_CACHE_PATH
+selector_resolver = SelectorResolver()
+
+# Last known good result per Job ID, served (marked stale) while the breaker is open
+_last_results = OrderedDict()
+_last_results_lock = threading.Lock()
+
+
+def _timeout_result(job_id: str, stage: str) -> dict:
+    return {
+        "success": False,
+        "job_id": job_id,
+        "message": f"Lookup timed out during {stage}",
+        "timed_out": True,
+        "stage": stage
+    }
+
+
+def _is_portal_failure(result: dict) -> bool:
+    """
+    Scraping errors count against the breaker; 'not found' does not.
+    Running out of our own deadline never counts: it may be time spent in the
+    account queue or our fixed pauses. A page load that times out with its
+    full budget comes back as an error (see _goto) and does count.
+    """
+    if result.get("timed_out"):
+        return False
+    return bool(result.get("error")) or result.get("message") == "Failed to reach results page"
+
+
+def _remember_result(job_id: str, result: dict):
+    with _last_results_lock:
+        _last_results[job_id] = (datetime.now(), copy.deepcopy(result))
+        _last_results.move_to_end(job_id)
+        while len(_last_results) > STALE_CACHE_MAX:
+            _last_results.popitem(last=False)
+
+
+def _stale_result(job_id: str):
+    with _last_results_lock:
+        cached = _last_results.get(job_id)
+    if not cached:
+        return None
+    cached_at, result = cached
+    stale = copy.deepcopy(result)
+    stale["stale"] = True
+    stale["cached_at"] = cached_at.strftime("%Y-%m-%d %H:%M")
+    stale["message"] = f"VeEX portal unavailable, showing last known result for Job ID {job_id}"
+    return stale
+
+
 # -----------------------------------------
 # Main Search Function
 # -----------------------------------------
-def playwright_search(job_id: str, headless=True, timeout=60000) -> dict:
+def playwright_search(job_id: str, headless=True, timeout=60000, deadline: Deadline = None) -> dict:
     """
-    Logs in to VeEX portal using Playwright, searches for job ID, and extracts data.
-    Returns structured job data dictionary.
+    Circuit-breaker guarded portal lookup.
+    While the breaker is open, returns the last known result for the Job ID
+    (marked with stale=True) or a fast breaker_open failure.
+    `timeout` caps individual actions; `deadline` bounds the whole lookup and
+    yields a timed_out result (with the stage reached) when it runs out.
     """
-    logger.info(f"Searching for Job ID: {job_id}")
-    
-    with sync_playwright() as p:
+    if deadline is None:
+        deadline = Deadline(LOOKUP_DEADLINE_SECONDS)
+
+    token = portal_breaker.allow()
+    if token is None:
+        logger.warning(f"⚡ VeEX circuit open, skipping live lookup for {job_id}")
+        stale = _stale_result(job_id)
+        if stale:
+            return stale
+        return {
+            "success": False,
+            "job_id": job_id,
+            "message": "VeEX portal temporarily unavailable",
+            "breaker_open": True
+        }
+
+    try:
+        result = _get_pool(headless).search(job_id, timeout=timeout, deadline=deadline)
+    except Exception:
+        portal_breaker.record_failure(token)
+        raise
+
+    _record_outcome(job_id, result, token)
+    return result
+
+
+def batch_search(job_ids: list[str], headless=True, timeout=60000, budget: float = None) -> dict:
+    """
+    Background lookups for the watch poller. Runs one Job ID at a time and only
+    on an idle account session, so interactive lookups never queue behind more
+    than one watched lookup. Each lookup gets its own VEEX_LOOKUP_DEADLINE.
+    Lookups search the results page the session already has open, so after
+    the first one they skip navigation, login and the page-load pauses.
+    Stops after `budget` seconds; IDs not reached are left for the next call.
+    Returns {job_id: result} for the IDs checked; stops early while the
+    circuit breaker is open.
+    """
+    pool = _get_pool(headless)
+    started = time.monotonic()
+    results = {}
+
+    for job_id in dict.fromkeys(job_ids):
+        # Wait for a session with nothing queued, yielding to webhook traffic
+        session = pool.acquire_idle()
+        while session is None:
+            if budget is not None and time.monotonic() - started >= budget:
+                return results
+            time.sleep(BACKGROUND_IDLE_POLL_SECONDS)
+            session = pool.acquire_idle()
+
+        token = portal_breaker.allow()
+        if token is None:
+            pool.release(session)
+            return results
+
         try:
-            # Launch browser with anti-detection settings
-            browser = p.chromium.launch(
-                headless=headless,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu'
-                ]
-            )
-            
-            # Create context with realistic browser settings
-            context = browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={"width": 1920, "height": 1080},
-                locale='en-US',
-                timezone_id='America/New_York',
-                permissions=[],
-                extra_http_headers={
-                    'Accept-Language': 'en-US,en;q=0.9',
-                }
-            )
-            
-            # Add JavaScript to make browser look less like a bot
-            context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-            """)
-            page = context.new_page()
-
-            # Go to results page (will redirect to login if needed)
-            page.goto(VEEX_RESULTS_URL, timeout=timeout, wait_until="networkidle")
-            page.wait_for_timeout(10000)
-            
-            current_url = page.url
-            
-            username_selectors = [
-                'input[placeholder="Username"]',
-                'input[type="text"]',
-                'input[name="username"]',
-                'input#username',
-                'input[formcontrolname="username"]'
-            ]
-            
-            password_selectors = [
-                'input[placeholder="Password"]',
-                'input[type="password"]',
-                'input[name="password"]',
-                'input#password',
-                'input[formcontrolname="password"]'
+            result = pool.run(session, job_id, timeout=timeout, reuse_page=True)
+        except Exception:
+            portal_breaker.record_failure(token)
+            raise
+
+        _record_outcome(job_id, result, token)
+        results[job_id] = result
+        if budget is not None and time.monotonic() - started >= budget:
+            break
+    return results
+
+
+def _record_outcome(job_id: str, result: dict, token: int):
+    """Feed a lookup result (admitted with `token`) to the circuit breaker and the stale-result cache."""
+    if _is_portal_failure(result):
+        portal_breaker.record_failure(token)
+    else:
+        portal_breaker.record_success(token)
+        if result.get("success") and result.get("overall_status"):
+            _remember_result(job_id, result)
+
+
+# -----------------------------------------
+# Account Sessions
+# -----------------------------------------
+class PortalAuthError(Exception):
+    """Raised when the portal rejects an account's credentials."""
+
+
+class VeexAccount:
+    def __init__(self, username: str, password: str):
+        self.username = username
+        self.password = password
+
+
+def load_accounts() -> list[VeexAccount]:
+    """
+    Read service accounts from VEEX_ACCOUNTS ("user1:pass1,user2:pass2", passwords
+    URL-encoded like VEEX_PASSWORD), falling back to VEEX_USERNAME/VEEX_PASSWORD.
+    """
+    accounts = []
+    for entry in os.getenv("VEEX_ACCOUNTS", "").split(","):
+        entry = entry.strip()
+        if not entry or ":" not in entry:
+            continue
+        username, password = entry.split(":", 1)
+        accounts.append(VeexAccount(username.strip(), unquote(password)))
+
+    if not accounts and VEEX_USERNAME:
+        accounts.append(VeexAccount(VEEX_USERNAME, VEEX_PASSWORD))
+    return accounts
+
+
+AUTH_FAILURE_LIMIT = int(os.getenv("VEEX_AUTH_FAILURE_LIMIT", "2"))
+ACCOUNT_RETRY_SECONDS = float(os.getenv("VEEX_ACCOUNT_RETRY_SECONDS", "900"))
+SESSION_IDLE_SECONDS = float(os.getenv("VEEX_SESSION_IDLE_SECONDS", "600"))
+
+
+class AccountSession(threading.Thread):
+    """
+    Worker thread owning one Playwright browser context for one account.
+    Playwright's sync API is bound to the thread that created it, so every
+    page operation for this account runs here. The context (and its login
+    cookies) is kept between lookups and closed after SESSION_IDLE_SECONDS.
+    """
+
+    def __init__(self, account: VeexAccount, headless: bool = True):
+        super().__init__(name=f"veex-session-{account.username}", daemon=True)
+        self.account = account
+        self.headless = headless
+        self.jobs = queue.Queue()
+        self.in_flight = 0
+        self.auth_failures = 0
+        self.disabled_until = 0.0
+        self.last_assigned = 0.0
+        # Greenlet running the portal flow; read by app.profiler while Playwright waits
+        self.greenlet = None
+        self._playwright = None
+        self._browser = None
+        self._page = None
+
+    @property
+    def enabled(self) -> bool:
+        return time.monotonic() >= self.disabled_until
+
+    def _open(self):
+        self._playwright = sync_playwright().start()
+        # Launch browser with anti-detection settings
+        self._browser = self._playwright.chromium.launch(
+            headless=self.headless,
+            args=[
+                '--disable-blink-features=AutomationControlled',
+                '--no-sandbox',
+                '--disable-dev-shm-usage',
+                '--disable-gpu'
             ]
-            
-            # Try to find username field
-            username_field = None
-            for selector in username_selectors:
-                try:
-                    field = page.locator(selector).first
-                    if field.is_visible(timeout=5000):
-                        username_field = field
-                        logger.info(f"✅ Username field found: {selector}")
-                        break
-                except:
-                    continue
-            
-            # If username field exists, we need to login
-            if username_field:
-                # Fill username
-                username_field.fill(VEEX_USERNAME, timeout=timeout)
-                
-                # Find and fill password
-                password_field = None
-                for selector in password_selectors:
-                    try:
-                        field = page.locator(selector).first
-                        if field.is_visible(timeout=5000):
-                            password_field = field
-                            break
-                    except:
-                        continue
-                
-                if not password_field:
-                    raise Exception("Could not find password field")
-                
-                password_field.fill(VEEX_PASSWORD, timeout=timeout)
-                password_field.press("Enter")
-                page.wait_for_timeout(8000)
-                
-                current_url = page.url
-                page.wait_for_timeout(3000)
-                
-                # Navigate to Result & Report
-                try:
-                    page.evaluate('''
-                        const element = document.evaluate(
-                            "//*[contains(text(), 'Result & Report')]",
-                            document,
-                            null,
-                            XPathResult.FIRST_ORDERED_NODE_TYPE,
-                            null
-                        ).singleNodeValue;
-                        if (element) element.click();
-                    ''')
-                    page.wait_for_timeout(5000)
-                except:
-                    page.goto("https://charter.veexinc.net/home/result-and-report", timeout=timeout)
-                    page.wait_for_timeout(3000)
-                
-                # Navigate to Results view
-                page.wait_for_timeout(3000)
-                try:
-                    page.evaluate('''
-                        const element = document.evaluate(
-                            "//*[text()='Results']",
-                            document,
-                            null,
-                            XPathResult.FIRST_ORDERED_NODE_TYPE,
-                            null
-                        ).singleNodeValue;
-                        if (element) element.click();
-                    ''')
-                    page.wait_for_timeout(5000)
-                except:
-                    page.goto(VEEX_RESULTS_URL, timeout=timeout)
-                    page.wait_for_timeout(5000)
-            
-            # Verify we're on the results page
-            current_url = page.url
-            if "result" not in current_url.lower():
+        )
+        
+        # Create context with realistic browser settings
+        context = self._browser.new_context(
+            user_agent=USER_AGENT,
+            viewport={"width": 1920, "height": 1080},
+            locale='en-US',
+            timezone_id='America/New_York',
+            permissions=[],
+            extra_http_headers={
+                'Accept-Language': 'en-US,en;q=0.9',
+            }
+        )
+        
+        # Add JavaScript to make browser look less like a bot
+        context.add_init_script("""
+            Object.defineProperty(navigator, 'webdriver', {
+                get: () => undefined
+            });
+        """)
+        self._page = context.new_page()
+        logger.info(f"🌐 Browser session opened for VeEX account {self.account.username}")
+
+    def _close(self):
+        try:
+            if self._browser:
+                self._browser.close()
+        except:
+            pass
+        try:
+            if self._playwright:
+                self._playwright.stop()
+        except:
+            pass
+        self._playwright = None
+        self._browser = None
+        self._page = None
+
+    def run(self):
+        self.greenlet = current_greenlet()
+        while True:
+            try:
+                job_id, timeout, deadline, reuse_page, future = self.jobs.get(timeout=SESSION_IDLE_SECONDS)
+            except queue.Empty:
+                if self._browser:
+                    logger.info(f"💤 Closing idle session for VeEX account {self.account.username}")
+                    self._close()
+                continue
+
+            try:
+                # Batch lookups start their budget when the session picks them up
+                deadline = deadline or Deadline(LOOKUP_DEADLINE_SECONDS)
+                if not self._page:
+                    self._open()
+                result = _search_on_page(self._page, self.account, job_id, deadline,
+                                         headless=self.headless, timeout=timeout, reuse_page=reuse_page)
+                self.auth_failures = 0
+            except DeadlineExceeded as e:
+                logger.warning(f"⏱️ {e} for Job ID {job_id}")
+                result = _timeout_result(job_id, e.stage)
+            except PortalAuthError as e:
+                logger.error(f"🔒 {e}")
+                self.auth_failures += 1
+                if self.auth_failures >= AUTH_FAILURE_LIMIT:
+                    self.disabled_until = time.monotonic() + ACCOUNT_RETRY_SECONDS
+                    self.auth_failures = 0
+                    logger.warning(f"🚫 VeEX account {self.account.username} out of rotation for {ACCOUNT_RETRY_SECONDS:.0f}s")
+                # Drop the context so the next attempt starts from a clean login
+                self._close()
+                result = {
+                    "success": False,
+                    "job_id": job_id,
+                    "message": "VeEX login failed",
+                    "auth_failed": True
+                }
+            except Exception as e:
+                if deadline.expired:
+                    # A Playwright timeout that was trimmed to the remaining budget
+                    logger.warning(f"⏱️ Deadline exceeded during {deadline.stage} for Job ID {job_id}")
+                    result = _timeout_result(job_id, deadline.stage)
+                else:
+                    logger.error(f"Scraping error: {e}")
+                    # Recycle the browser in case the page or context is wedged
+                    self._close()
+                    result = {
+                        "success": False,
+                        "job_id": job_id,
+                        "message": "Error during scraping",
+                        "error": str(e)
+                    }
+            future.set_result(result)
+
+
+class SessionPool:
+    """Least-busy scheduling of lookups across per-account sessions."""
+
+    def __init__(self, accounts: list[VeexAccount], headless: bool = True):
+        self._lock = threading.Lock()
+        self.sessions = [AccountSession(account, headless=headless) for account in accounts]
+        for session in self.sessions:
+            session.start()
+
+    def _acquire(self, exclude: set):
+        with self._lock:
+            candidates = [s for s in self.sessions if s.enabled and s.account.username not in exclude]
+            if not candidates:
+                return None
+            session = min(candidates, key=lambda s: (s.in_flight, s.last_assigned))
+            session.in_flight += 1
+            session.last_assigned = time.monotonic()
+            return session
+
+    def release(self, session: AccountSession):
+        with self._lock:
+            session.in_flight -= 1
+
+    def _submit(self, session: AccountSession, job_id: str, timeout, deadline, reuse_page=False) -> Future:
+        future = Future()
+        future.add_done_callback(lambda f, s=session: self.release(s))
+        session.jobs.put((job_id, timeout, deadline, reuse_page, future))
+        return future
+
+    def search(self, job_id: str, timeout=60000, deadline: Deadline = None) -> dict:
+        """Run a lookup on the least-busy account, retrying on another account after an auth failure."""
+        deadline = deadline or Deadline(LOOKUP_DEADLINE_SECONDS)
+        tried = set()
+        while True:
+            session = self._acquire(tried)
+            if not session:
                 return {
                     "success": False,
                     "job_id": job_id,
-                    "message": "Failed to reach results page"
+                    "message": "Error during scraping",
+                    "error": "No VeEX accounts available"
                 }
+
+            tried.add(session.account.username)
+            future = self._submit(session, job_id, timeout, deadline)
+            try:
+                # Small grace so the session's own timeout result (with its stage) wins
+                result = future.result(timeout=deadline.remaining() + 2)
+            except FutureTimeout:
+                logger.warning(f"⏱️ Job ID {job_id} still waiting on account {session.account.username} at deadline")
+                return {
+                    "success": False,
+                    "job_id": job_id,
+                    "message": "Lookup timed out waiting for a portal session",
+                    "timed_out": True,
+                    "stage": "queue"
+                }
+
+            if not result.get("auth_failed"):
+                return result
+            logger.info(f"Retrying Job ID {job_id} on another VeEX account")
+
+    def acquire_idle(self):
+        """Reserve a session with nothing queued or running, or None if all are busy."""
+        with self._lock:
+            idle = [s for s in self.sessions if s.enabled and s.in_flight == 0]
+            if not idle:
+                return None
+            session = min(idle, key=lambda s: s.last_assigned)
+            session.in_flight += 1
+            session.last_assigned = time.monotonic()
+            return session
+
+    def run(self, session: AccountSession, job_id: str, timeout=60000, reuse_page=False) -> dict:
+        """Run one lookup on a session reserved with acquire_idle()."""
+        return self._submit(session, job_id, timeout, None, reuse_page).result()
+
+    def snapshot(self) -> list[dict]:
+        with self._lock:
+            return [
+                {"account": s.account.username, "in_flight": s.in_flight, "enabled": s.enabled}
+                for s in self.sessions
+            ]
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(headless: bool = True) -> SessionPool:
+    with _pools_lock:
+        if headless not in _pools:
+            _pools[headless] = SessionPool(load_accounts(), headless=headless)
+        return _pools[headless]
+
+
+def session_snapshot() -> list[dict]:
+    """Per-account load and rotation state for the health endpoint."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [entry for pool in pools for entry in pool.snapshot()]
+
+
+# -----------------------------------------
+# Portal Flow
+# -----------------------------------------
+def _pause(page, deadline: Deadline, ms: int, timeout: int):
+    """
+    Fixed settle delay, trimmed to what is left of the deadline. Afterwards the
+    page's implicit action timeout is re-sized to the (now smaller) budget.
+    """
+    page.wait_for_timeout(deadline.timeout_ms(ms))
+    page.set_default_timeout(deadline.timeout_ms(timeout))
+
+
+def _goto(page, deadline: Deadline, url: str, timeout: int, **kwargs):
+    """
+    page.goto within the deadline. A load that times out with its full
+    `timeout` is the portal failing and propagates as an error; one cut
+    short by our own deadline is reported as a DeadlineExceeded.
+    """
+    goto_ms = deadline.timeout_ms(timeout)
+    try:
+        page.goto(url, timeout=goto_ms, **kwargs)
+    except PlaywrightTimeout:
+        if goto_ms < timeout:
+            raise DeadlineExceeded(deadline.stage)
+        raise
+
+
+def _enter_stage(page, deadline: Deadline, stage: str, timeout: int):
+    """Start a stage: implicit action timeouts never exceed the remaining budget."""
+    remaining = deadline.enter(stage)
+    page.set_default_timeout(deadline.timeout_ms(timeout))
+    logger.info(f"⏳ Stage '{stage}' with {remaining:.1f}s remaining")
+
+
+def _results_page_ready(page) -> bool:
+    """True if the page is still on a logged-in results view from an earlier lookup."""
+    return "result" in page.url.lower() and not page.locator('input[type="password"]').first.is_visible()
+
+
+def _open_results_page(page, account: VeexAccount, deadline: Deadline, timeout=60000) -> bool:
+    """
+    Navigates to the results view, logging in first if the portal redirects
+    to the login form, and waits for its content. Returns False if the
+    results page could not be reached.
+    """
+    # Go to results page (will redirect to login if needed)
+    _enter_stage(page, deadline, "navigation", timeout)
+    _goto(page, deadline, VEEX_RESULTS_URL, timeout, wait_until="networkidle")
+    _pause(page, deadline, 10000, timeout)
+    
+    current_url = page.url
+    
+    username_selectors = [
+        'input[placeholder="Username"]',
+        'input[type="text"]',
+        'input[name="username"]',
+        'input#username',
+        'input[formcontrolname="username"]'
+    ]
+    
+    password_selectors = [
+        'input[placeholder="Password"]',
+        'input[type="password"]',
+        'input[name="password"]',
+        'input#password',
+        'input[formcontrolname="password"]'
+    ]
+    
+    # A visible password field means we were redirected to the login form.
+    # (Keyed off the password field: the results page has plain text inputs
+    # too, which a reused session must not mistake for the username box.)
+    _enter_stage(page, deadline, "login", timeout)
+    password_field, _ = selector_resolver.resolve(page, "password", password_selectors)
+    
+    # If login form exists, we need to login
+    if password_field:
+        # Find and fill username
+        username_field, selector = selector_resolver.resolve(
+            page, "username", username_selectors, timeout_ms=deadline.timeout_ms(5000))
+        if not username_field:
+            raise Exception("Could not find username field")
+        logger.info(f"✅ Username field found: {selector}")
+        username_field.fill(account.username, timeout=deadline.timeout_ms(timeout))
+        
+        # Fill password
+        password_field.fill(account.password, timeout=deadline.timeout_ms(timeout))
+        password_field.press("Enter")
+
+        # Wait for the login form to go away; still showing after the full
+        # wait means the portal rejected this account. A wait cut short by our
+        # own deadline is a timeout, not a rejection.
+        login_wait_ms = deadline.timeout_ms(timeout)
+        try:
+            page.locator('input[type="password"]').first.wait_for(state="hidden", timeout=login_wait_ms)
+        except PlaywrightTimeout:
+            if login_wait_ms < timeout:
+                raise DeadlineExceeded(deadline.stage)
+            raise PortalAuthError(f"Login rejected for VeEX account {account.username}")
+
+        current_url = page.url
+        _pause(page, deadline, 3000, timeout)
+        
+        # Navigate to Result & Report
+        _enter_stage(page, deadline, "navigation", timeout)
+        try:
+            page.evaluate('''
+                const element = document.evaluate(
+                    "//*[contains(text(), 'Result & Report')]",
+                    document,
+                    null,
+                    XPathResult.FIRST_ORDERED_NODE_TYPE,
+                    null
+                ).singleNodeValue;
+                if (element) element.click();
+            ''')
+            _pause(page, deadline, 5000, timeout)
+        except:
+            _goto(page, deadline, "https://charter.veexinc.net/home/result-and-report", timeout)
+            _pause(page, deadline, 3000, timeout)
+        
+        # Navigate to Results view
+        _pause(page, deadline, 3000, timeout)
+        try:
+            page.evaluate('''
+                const element = document.evaluate(
+                    "//*[text()='Results']",
+                    document,
+                    null,
+                    XPathResult.FIRST_ORDERED_NODE_TYPE,
+                    null
+                ).singleNodeValue;
+                if (element) element.click();
+            ''')
+            _pause(page, deadline, 5000, timeout)
+        except:
+            _goto(page, deadline, VEEX_RESULTS_URL, timeout)
+            _pause(page, deadline, 5000, timeout)
+    
+    # Verify we're on the results page
+    current_url = page.url
+    if "result" not in current_url.lower():
+        return False
+    
+    # Wait for page content to load
+    _pause(page, deadline, 15000, timeout)
+    return True
+
+
+def _search_on_page(page, account: VeexAccount, job_id: str, deadline: Deadline, headless=True, timeout=60000,
+                    reuse_page=False) -> dict:
+    """
+    Searches for job ID on an account's page, logging in first if the portal
+    redirects to the login form, and extracts data.
+    With `reuse_page`, a page still showing the results view from the previous
+    lookup is searched directly, skipping navigation and its page-load pauses.
+    Every stage runs against `deadline`; DeadlineExceeded aborts the lookup.
+    Returns structured job data dictionary.
+    """
+    deadline.enter("queue")
+    logger.info(f"Searching for Job ID: {job_id} (account {account.username})")
+    
+    if reuse_page and _results_page_ready(page):
+        logger.info("Reusing the open results page")
+    elif not _open_results_page(page, account, deadline, timeout):
+        return {
+            "success": False,
+            "job_id": job_id,
+            "message": "Failed to reach results page"
+        }
+    
+    # Look for search/filter controls
+    _enter_stage(page, deadline, "search", timeout)
+    logger.info("Looking for search controls and filters...")
+    
+    # First, scroll down to see the search controls at the bottom
+    logger.info("Scrolling to bottom to find search controls...")
+    page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+    _pause(page, deadline, 2000, timeout)
+    
+    # Take screenshot before search
+    if not headless:
+        try:
+            page.screenshot(path="before_search.png")
+            logger.info("Screenshot saved: before_search.png")
+        except:
+            pass
+    
+    # First, find and select "Job ID" from the "Search By" dropdown
+    try:
+        logger.info("Looking for 'Search By' dropdown...")
+        # The search by dropdown should be near the bottom of the page
+        search_by_select, _ = selector_resolver.resolve(
+            page, "search_by", ['select'], timeout_ms=deadline.timeout_ms(2000))
+        if search_by_select:
+            # Select "Job ID" option
+            search_by_select.select_option(label="Job ID", timeout=deadline.timeout_ms(timeout))
+            logger.info("Selected 'Job ID' from Search By dropdown")
+            _pause(page, deadline, 1000, timeout)
+        else:
+            logger.warning("Search By dropdown not visible")
+    except Exception as e:
+        logger.error(f"Error selecting Job ID filter: {e}")
+    
+    # Find the search input field (should be visible after selecting Job ID)
+    logger.info("Looking for search input field...")
+    try:
+        # The last visible AND enabled text input (likely the search field)
+        search_input, selector = selector_resolver.resolve(
+            page, "search_input", ['input[type="text"]'],
+            timeout_ms=deadline.timeout_ms(2000), pick="last", enabled=True)
+        
+        if search_input:
+            logger.info(f"Found enabled search input: {selector}")
+            # Click to focus
+            search_input.click(timeout=deadline.timeout_ms(timeout))
+            _pause(page, deadline, 500, timeout)
+            # Clear any existing value
+            search_input.fill("", timeout=deadline.timeout_ms(timeout))
+            _pause(page, deadline, 500, timeout)
+            # Fill with Job ID
+            search_input.fill(job_id, timeout=deadline.timeout_ms(timeout))
+            logger.info(f"Filled Job ID '{job_id}' into search field")
+            _pause(page, deadline, 2000, timeout)
+        else:
+            logger.warning("No enabled search input found")
+    except Exception as e:
+        logger.error(f"Error filling search input: {e}")
+    
+    # Click the Search button
+    logger.info("Looking for Search button...")
+    try:
+        search_button, _ = selector_resolver.resolve(
+            page, "search_button", ['button:has-text("Search")'], timeout_ms=deadline.timeout_ms(2000))
+        if search_button:
+            search_button.click(timeout=deadline.timeout_ms(timeout))
+            logger.info("Clicked Search button")
+            _pause(page, deadline, 10000, timeout)  # Wait for search results to load
             
-            # Wait for page content to load
-            page.wait_for_timeout(15000)
-            
-            # Look for search/filter controls
-            logger.info("Looking for search controls and filters...")
-            
-            # First, scroll down to see the search controls at the bottom
-            logger.info("Scrolling to bottom to find search controls...")
-            page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-            page.wait_for_timeout(2000)
+            # Check if we got results
+            current_url = page.url
+            logger.info(f"Current URL after search: {current_url}")
             
-            # Take screenshot before search
+            # Take screenshot for debugging
             if not headless:
                 try:
-                    page.screenshot(path="before_search.png")
-                    logger.info("Screenshot saved: before_search.png")
+                    page.screenshot(path="after_search.png")
+                    logger.info("Screenshot saved: after_search.png")
                 except:
                     pass
+        else:
+            logger.warning("Search button not visible")
+    except Exception as e:
+        logger.error(f"Error clicking search button: {e}")
+    
+    _pause(page, deadline, 3000, timeout)
+    
+    # Scroll to load all content
+    _enter_stage(page, deadline, "extraction", timeout)
+    logger.info("Scrolling page to load all results...")
+    for _ in range(5):  # Scroll 5 times to load more content
+        page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
+        _pause(page, deadline, 2000, timeout)
+    
+    # Scroll back to top
+    page.evaluate('window.scrollTo(0, 0)')
+    _pause(page, deadline, 2000, timeout)
+    
+    # Try to find Job ID in table rows directly
+    logger.info(f"Looking for Job ID {job_id} in table rows...")
+    all_rows = page.locator('table tr').all()
+    logger.info(f"Found {len(all_rows)} table rows")
+    
+    # Print first 3 data rows to see what's in the table
+    for idx in range(min(5, len(all_rows))):
+        row_text = all_rows[idx].text_content(timeout=deadline.timeout_ms(timeout))
+        logger.info(f"Row {idx}: {row_text[:150]}")
+    
+    found_in_row = False
+    for idx, row in enumerate(all_rows):
+        deadline.check()
+        row_text = row.text_content(timeout=deadline.timeout_ms(timeout))
+        if job_id in row_text:
+            logger.info(f"✅ Found Job ID in row {idx}: {row_text[:100]}")
+            found_in_row = True
+            break
+    
+    if not found_in_row:
+        logger.warning(f"Job ID {job_id} not found in any of {len(all_rows)} table rows")
+        logger.info("Checking if search field worked - looking at visible Job IDs...")
+        # Get all text content from first 10 data rows
+        sample_ids = []
+        for idx in range(min(10, len(all_rows))):
+            deadline.check()
+            cells = all_rows[idx].locator('td').all()
+            if len(cells) > 0:
+                first_cell = cells[0].text_content(timeout=deadline.timeout_ms(timeout)).strip()
+                if first_cell and len(first_cell) > 10:
+                    sample_ids.append(first_cell)
+        logger.info(f"Sample Job IDs on page: {sample_ids[:5]}")
+    
+    # Extract data from page
+    page_text = page.text_content('body', timeout=deadline.timeout_ms(timeout))
+    
+    if job_id in page_text:
+        try:
+            job_elements = page.locator(f'text="{job_id}"').all()
             
-            # First, find and select "Job ID" from the "Search By" dropdown
-            try:
-                logger.info("Looking for 'Search By' dropdown...")
-                # The search by dropdown should be near the bottom of the page
-                search_by_select = page.locator('select').first
-                if search_by_select.is_visible():
-                    # Select "Job ID" option
-                    search_by_select.select_option(label="Job ID")
-                    logger.info("Selected 'Job ID' from Search By dropdown")
-                    page.wait_for_timeout(1000)
-                else:
-                    logger.warning("Search By dropdown not visible")
-            except Exception as e:
-                logger.error(f"Error selecting Job ID filter: {e}")
-            
-            # Find the search input field (should be visible after selecting Job ID)
-            logger.info("Looking for search input field...")
-            try:
-                # Look for all text inputs and find enabled ones
-                all_inputs = page.locator('input[type="text"]').all()
-                logger.info(f"Found {len(all_inputs)} text input fields")
+            if len(job_elements) > 0:
+                first_element = job_elements[0]
+                parent_row = first_element.locator('xpath=ancestor::tr').first
                 
-                # Try the last visible AND enabled input (likely the search field)
-                search_input = None
-                for idx, inp in enumerate(reversed(all_inputs)):
-                    try:
-                        if inp.is_visible() and inp.is_enabled():
-                            search_input = inp
-                            logger.info(f"Found enabled input at reverse index {idx}")
-                            break
-                    except:
-                        continue
-                
-                if search_input:
-                    # Click to focus
-                    search_input.click()
-                    page.wait_for_timeout(500)
-                    # Clear any existing value
-                    search_input.fill("")
-                    page.wait_for_timeout(500)
-                    # Fill with Job ID
-                    search_input.fill(job_id)
-                    logger.info(f"Filled Job ID '{job_id}' into search field")
-                    page.wait_for_timeout(2000)
-                else:
-                    logger.warning("No enabled search input found")
-            except Exception as e:
-                logger.error(f"Error filling search input: {e}")
-            
-            # Click the Search button
-            logger.info("Looking for Search button...")
-            try:
-                search_button = page.locator('button:has-text("Search")').first
-                if search_button.is_visible():
-                    search_button.click()
-                    logger.info("Clicked Search button")
-                    page.wait_for_timeout(10000)  # Wait for search results to load
-                    
-                    # Check if we got results
-                    current_url = page.url
-                    logger.info(f"Current URL after search: {current_url}")
+                if parent_row.is_visible():
+                    cells = parent_row.locator('td, th').all()
+                    cell_values = [cell.text_content(timeout=deadline.timeout_ms(timeout)).strip() for cell in cells]
                     
-                    # Take screenshot for debugging
-                    if not headless:
-                        try:
-                            page.screenshot(path="after_search.png")
-                            logger.info("Screenshot saved: after_search.png")
-                        except:
-                            pass
-                else:
-                    logger.warning("Search button not visible")
-            except Exception as e:
-                logger.error(f"Error clicking search button: {e}")
-            
-            page.wait_for_timeout(3000)
-            
-            # Scroll to load all content
-            logger.info("Scrolling page to load all results...")
-            for _ in range(5):  # Scroll 5 times to load more content
-                page.evaluate('window.scrollTo(0, document.body.scrollHeight)')
-                page.wait_for_timeout(2000)
-            
-            # Scroll back to top
-            page.evaluate('window.scrollTo(0, 0)')
-            page.wait_for_timeout(2000)
-            
-            # Try to find Job ID in table rows directly
-            logger.info(f"Looking for Job ID {job_id} in table rows...")
-            all_rows = page.locator('table tr').all()
-            logger.info(f"Found {len(all_rows)} table rows")
-            
-            # Print first 3 data rows to see what's in the table
-            for idx in range(min(5, len(all_rows))):
-                row_text = all_rows[idx].text_content()
-                logger.info(f"Row {idx}: {row_text[:150]}")
-            
-            found_in_row = False
-            for idx, row in enumerate(all_rows):
-                row_text = row.text_content()
-                if job_id in row_text:
-                    logger.info(f"✅ Found Job ID in row {idx}: {row_text[:100]}")
-                    found_in_row = True
-                    break
-            
-            if not found_in_row:
-                logger.warning(f"Job ID {job_id} not found in any of {len(all_rows)} table rows")
-                logger.info("Checking if search field worked - looking at visible Job IDs...")
-                # Get all text content from first 10 data rows
-                sample_ids = []
-                for idx in range(min(10, len(all_rows))):
-                    cells = all_rows[idx].locator('td').all()
-                    if len(cells) > 0:
-                        first_cell = cells[0].text_content().strip()
-                        if first_cell and len(first_cell) > 10:
-                            sample_ids.append(first_cell)
-                logger.info(f"Sample Job IDs on page: {sample_ids[:5]}")
-            
-            # Extract data from page
-            page_text = page.text_content('body')
-            
-            if job_id in page_text:
-                try:
-                    job_elements = page.locator(f'text="{job_id}"').all()
+                    # Parse component status from result string
+                    # Format: "Pass CRF: - |E: P |R: - |B: P |O: P |P: -"
+                    component_status = {}
+                    overall_status = "UNKNOWN"
                     
-                    if len(job_elements) > 0:
-                        first_element = job_elements[0]
-                        parent_row = first_element.locator('xpath=ancestor::tr').first
+                    if len(cell_values) > 24:
+                        result_string = cell_values[24]
+                        
+                        # Extract overall status (Pass/Fail at the beginning)
+                        if result_string.startswith("Pass"):
+                            overall_status = "PASS"
+                        elif result_string.startswith("Fail"):
+                            overall_status = "FAIL"
                         
-                        if parent_row.is_visible():
-                            cells = parent_row.locator('td, th').all()
-                            cell_values = [cell.text_content().strip() for cell in cells]
-                            
-                            # Parse component status from result string
-                            # Format: "Pass CRF: - |E: P |R: - |B: P |O: P |P: -"
-                            component_status = {}
-                            overall_status = "UNKNOWN"
-                            
-                            if len(cell_values) > 24:
-                                result_string = cell_values[24]
+                        # Remove the "Pass" or "Fail" prefix from result_string before parsing
+                        if result_string.startswith("Pass "):
+                            result_string = result_string[5:]  # Remove "Pass "
+                        elif result_string.startswith("Fail "):
+                            result_string = result_string[5:]  # Remove "Fail "
+                        
+                        # Parse component results
+                        # CRF/C: Cable RF/tap, E: EPON/gnb_BI, R: RFoG, B: Bulkhead, O: ONU, P: Pressure
+                        parts = result_string.split("|")
+                        for part in parts:
+                            part = part.strip()
+                            if ":" in part:
+                                key, value = part.split(":", 1)
+                                key = key.strip()
+                                value = value.strip()
                                 
-                                # Extract overall status (Pass/Fail at the beginning)
-                                if result_string.startswith("Pass"):
-                                    overall_status = "PASS"
-                                elif result_string.startswith("Fail"):
-                                    overall_status = "FAIL"
+                                # Map abbreviations to full names
+                                key_map = {
+                                    "CRF": "tap",
+                                    "C": "tap",
+                                    "E": "gnb_BI",
+                                    "R": "RFoG",
+                                    "B": "Cpe",  # Changed from gnb_BI to Cpe
+                                    "O": "ONU",
+                                    "P": "Pressure test"
+                                }
                                 
-                                # Remove the "Pass" or "Fail" prefix from result_string before parsing
-                                if result_string.startswith("Pass "):
-                                    result_string = result_string[5:]  # Remove "Pass "
-                                elif result_string.startswith("Fail "):
-                                    result_string = result_string[5:]  # Remove "Fail "
+                                full_key = key_map.get(key, key)
                                 
-                                # Parse component results
-                                # CRF/C: Cable RF/tap, E: EPON/gnb_BI, R: RFoG, B: Bulkhead, O: ONU, P: Pressure
-                                parts = result_string.split("|")
-                                for part in parts:
-                                    part = part.strip()
-                                    if ":" in part:
-                                        key, value = part.split(":", 1)
-                                        key = key.strip()
-                                        value = value.strip()
-                                        
-                                        # Map abbreviations to full names
-                                        key_map = {
-                                            "CRF": "tap",
-                                            "C": "tap",
-                                            "E": "gnb_BI",
-                                            "R": "RFoG",
-                                            "B": "Cpe",  # Changed from gnb_BI to Cpe
-                                            "O": "ONU",
-                                            "P": "Pressure test"
-                                        }
-                                        
-                                        full_key = key_map.get(key, key)
-                                        
-                                        # Map values
-                                        if value == "P":
-                                            component_status[full_key] = "✅ Passed"
-                                        elif value == "F":
-                                            component_status[full_key] = "❌ Failed"
-                                        elif value == "-" or value == "N/A":
-                                            component_status[full_key] = "➖ Missing"
-                                        else:
-                                            component_status[full_key] = value
-                            
-                            # Add TDR and CPE if not found
-                            if "Cpe" not in component_status:
-                                # Check if CPE info is in other cells
-                                component_status["Cpe"] = "➖ Missing"
-                            if "TDR" not in component_status:
-                                component_status["TDR"] = "➖ Missing"
-                            
-                            # Return structured data with correct mapping
-                            job_data = {
-                                "success": True,
-                                "job_id": job_id,
-                                "message": f"Job ID {job_id} found successfully",
-                                "raw_data": cell_values,
-                                "overall_status": overall_status,
-                                "account": cell_values[2] if len(cell_values) > 2 else "",  # Account
-                                "cable_type": cell_values[7] if len(cell_values) > 7 else "",  # Profile/Cable Type
-                                "date_uploaded": cell_values[5] if len(cell_values) > 5 else "",  # Date uploaded ID
-                                "test_type": cell_values[6] if len(cell_values) > 6 else "",  # Test type
-                                "date_measured": cell_values[10] if len(cell_values) > 10 else "",  # Date measured
-                                "test_set": cell_values[11] if len(cell_values) > 11 else "",  # Test set/Company
-                                "technician": cell_values[10] if len(cell_values) > 10 else "",  # Technician time
-                                "component_status": component_status
-                            }
-                            
-                            return job_data
-                            
-                except Exception as e:
-                    logger.error(f"Extraction error: {e}")
-                
-                return {
-                    "success": True,
-                    "job_id": job_id,
-                    "message": f"Job ID {job_id} found but extraction incomplete"
-                }
-            else:
-                return {
-                    "success": False,
-                    "job_id": job_id,
-                    "message": f"Job ID {job_id} not found"
-                }
-                
+                                # Map values
+                                if value == "P":
+                                    component_status[full_key] = "✅ Passed"
+                                elif value == "F":
+                                    component_status[full_key] = "❌ Failed"
+                                elif value == "-" or value == "N/A":
+                                    component_status[full_key] = "➖ Missing"
+                                else:
+                                    component_status[full_key] = value
+                    
+                    # Add TDR and CPE if not found
+                    if "Cpe" not in component_status:
+                        # Check if CPE info is in other cells
+                        component_status["Cpe"] = "➖ Missing"
+                    if "TDR" not in component_status:
+                        component_status["TDR"] = "➖ Missing"
+                    
+                    # Return structured data with correct mapping
+                    job_data = {
+                        "success": True,
+                        "job_id": job_id,
+                        "message": f"Job ID {job_id} found successfully",
+                        "raw_data": cell_values,
+                        "overall_status": overall_status,
+                        "account": cell_values[2] if len(cell_values) > 2 else "",  # Account
+                        "cable_type": cell_values[7] if len(cell_values) > 7 else "",  # Profile/Cable Type
+                        "date_uploaded": cell_values[5] if len(cell_values) > 5 else "",  # Date uploaded ID
+                        "test_type": cell_values[6] if len(cell_values) > 6 else "",  # Test type
+                        "date_measured": cell_values[10] if len(cell_values) > 10 else "",  # Date measured
+                        "test_set": cell_values[11] if len(cell_values) > 11 else "",  # Test set/Company
+                        "technician": cell_values[10] if len(cell_values) > 10 else "",  # Technician time
+                        "component_status": component_status
+                    }
+                    
+                    return job_data
+                    
         except Exception as e:
-            logger.error(f"Scraping error: {e}")
-            return {
-                "success": False,
-                "job_id": job_id,
-                "message": "Error during scraping",
-                "error": str(e)
-            }
-        finally:
-            try:
-                browser.close()
-            except:
-                pass
+            logger.error(f"Extraction error: {e}")
+        
+        return {
+            "success": True,
+            "job_id": job_id,
+            "message": f"Job ID {job_id} found but extraction incomplete",
+            "partial": True,
+            "timed_out": deadline.expired
+        }
+    else:
+        return {
+            "success": False,
+            "job_id": job_id,
+            "message": f"Job ID {job_id} not found"
+        }
@@ -0,0 +1,117 @@
+# app/selector_cache.py
+import os
+import json
+import logging
+import tempfile
+import threading
+from playwright.sync_api import TimeoutError as PlaywrightTimeout
+
+logger = logging.getLogger(__name__)
+
+SELECTOR_CACHE_PATH = os.getenv("SELECTOR_CACHE_PATH", ".selector_cache.json")
+
+
+class SelectorResolver:
+    """
+    Finds the element for a flow step ("username", "search_button", ...) from a
+    list of candidate selectors.
+
+    All candidates are probed at once as a single combined locator, so a miss
+    costs one wait instead of one per candidate. The selector that matched is
+    remembered per step on disk and tried first next time. It is only replaced
+    when it misses and another candidate matches; a page where no candidate
+    matches (e.g. no login form on a logged-in session) keeps it.
+    """
+
+    def __init__(self, path: str = SELECTOR_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._learned = self._load()
+
+    def _load(self) -> dict:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable selector cache {self.path}: {e}")
+            return {}
+
+    def _save(self):
+        if not self.path:
+            return
+        # Unique temp file per write: gunicorn workers may save concurrently,
+        # and os.replace must never move another process's half-written file.
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(self._learned, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not save selector cache {self.path}: {e}")
+
+    def learned(self, step: str):
+        with self._lock:
+            return self._learned.get(step)
+
+    def _remember(self, step: str, selector: str):
+        with self._lock:
+            if self._learned.get(step) == selector:
+                return
+            self._learned[step] = selector
+            self._save()
+        logger.info(f"🧠 Learned selector for '{step}': {selector}")
+
+    def resolve(self, page, step: str, candidates: list[str], timeout_ms: int = 0,
+                pick: str = "first", enabled: bool = False):
+        """
+        Return (locator, selector) for the first candidate with a visible match,
+        or (None, None). `timeout_ms` > 0 waits that long for any candidate to
+        appear; 0 checks the page as it is. `pick="last"` takes the last match
+        of a selector, `enabled=True` skips disabled elements.
+        """
+        suffix = ":visible:enabled" if enabled else ":visible"
+
+        def locate(selector):
+            loc = page.locator(selector + suffix)
+            return loc.last if pick == "last" else loc.first
+
+        learned = self.learned(step)
+        if learned in candidates:
+            loc = locate(learned)
+            if timeout_ms > 0:
+                # Give a still-rendering page the full wait before doubting the learned selector
+                try:
+                    loc.wait_for(state="attached", timeout=timeout_ms)
+                    return loc, learned
+                except PlaywrightTimeout:
+                    pass
+            elif loc.count():
+                return loc, learned
+            # The wait is already spent; just check what the page has now
+            timeout_ms = 0
+
+        combined = page.locator(", ".join(c + suffix for c in candidates)).first
+        if timeout_ms > 0:
+            try:
+                combined.wait_for(state="attached", timeout=timeout_ms)
+            except PlaywrightTimeout:
+                return None, None
+        elif not combined.count():
+            return None, None
+
+        for selector in candidates:
+            loc = locate(selector)
+            if loc.count():
+                if learned and selector != learned:
+                    logger.info(f"Learned selector for '{step}' no longer matches, re-learning")
+                self._remember(step, selector)
+                return loc, selector
+        return None, None
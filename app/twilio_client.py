@@ -2,6 +2,7 @@
 import os
 import logging
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,18 +11,21 @@ logger = logging.getLogger(__name__)
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_WHATSAPP_NUMBER = os.getenv("TWILIO_WHATSAPP_NUMBER")  # format: whatsapp:+14155238886
+# Per-request HTTP timeout so a slow Twilio API call cannot eat the webhook's budget
+TWILIO_HTTP_TIMEOUT = float(os.getenv("TWILIO_HTTP_TIMEOUT", "10"))
 
 client = None
 if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN,
+                        http_client=TwilioHttpClient(timeout=TWILIO_HTTP_TIMEOUT))
         logger.info("✅ Twilio client initialized successfully")
     except Exception as e:
         logger.error(f"❌ Failed to initialize Twilio client: {e}")
 else:
     logger.warning("⚠️ Twilio credentials not found in environment variables")
 
-def send_whatsapp_message(to_number: str, body: str, max_retries: int = 3):
+def send_whatsapp_message(to_number: str, body: str, max_retries: int = 3, deadline=None):
     """
     Send a WhatsApp message using Twilio with retry logic.
     
@@ -29,6 +33,7 @@ def send_whatsapp_message(to_number: str, body: str, max_retries: int = 3):
         to_number: WhatsApp number in format 'whatsapp:+92300xxxxxxx'
         body: Message content (max 1600 characters for WhatsApp)
         max_retries: Number of retry attempts on failure
+        deadline: Optional app.deadline.Deadline; no attempt starts after it expires
     
     Returns:
         Message SID on success, None on failure
@@ -52,6 +57,10 @@ def send_whatsapp_message(to_number: str, body: str, max_retries: int = 3):
         logger.warning(f"Message truncated to 1600 characters")
     
     for attempt in range(max_retries):
+        if deadline is not None and deadline.expired:
+            logger.error(f"⏱️ Deadline reached, not sending message to {to_number}")
+            return None
+        
         try:
             logger.info(f"📤 Sending WhatsApp message to {to_number} (attempt {attempt + 1}/{max_retries})")
             
@@ -72,6 +81,10 @@ def send_whatsapp_message(to_number: str, body: str, max_retries: int = 3):
                 logger.error(f"❌ All {max_retries} attempts failed for message to {to_number}")
                 raise
             
+            if deadline is not None and deadline.remaining() < 1 + TWILIO_HTTP_TIMEOUT:
+                logger.error(f"⏱️ No time left to retry message to {to_number}")
+                raise
+            
             # Wait before retry
             import time
             time.sleep(1)
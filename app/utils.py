@@ -36,6 +36,11 @@ Company: {job_data.get('test_set', 'N/A')}
 Component Status:
 """
     
+    # Flag results served from cache while the portal is unreachable
+    if job_data.get("stale"):
+        message = (f"⚠️ VeEX portal is currently unavailable. Showing last known result "
+                   f"(checked {job_data.get('cached_at', 'earlier')}), which may be out of date.\n\n") + message
+    
     # Add component statuses from parsed data
     component_status = job_data.get('component_status', {})
     if component_status:
@@ -91,7 +96,11 @@ I can help you with:
    • I'll fetch the job details from VeEX portal
    • You'll get component status, dates, and technician info
 
-2️⃣ **General Questions**
+2️⃣ **Job Watch**
+   • Send "watch <Job ID>" and I'll message you when its results change
+   • Send "unwatch <Job ID>" to stop
+
+3️⃣ **General Questions**
    • Ask about date/time
    • General information queries
    
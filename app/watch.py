@@ -0,0 +1,248 @@
+# app/watch.py
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from app.scraper import batch_search
+from app.twilio_client import send_whatsapp_message
+from app.utils import format_job_response
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: single process, no file locking
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+WATCH_STORE_PATH = os.getenv("WATCH_STORE_PATH", "watch_subscriptions.json")
+WATCH_POLL_INTERVAL = float(os.getenv("WATCH_POLL_INTERVAL", "300"))  # seconds, 0 disables polling
+# Max lookups per cycle: ~30s each on an open results page, plus ~40s to open it
+WATCH_BATCH_SIZE = int(os.getenv("WATCH_BATCH_SIZE", "6"))
+WATCH_CYCLE_SECONDS = float(os.getenv("WATCH_CYCLE_SECONDS", "240"))  # time budget per cycle
+WATCH_TTL_HOURS = float(os.getenv("WATCH_TTL_HOURS", "24"))
+
+
+class SubscriptionStore:
+    """
+    Watched Job IDs persisted as JSON:
+        {job_id: {"subscribers": [...], "created": ts, "checked": ts, "last": {...} | null}}
+
+    Every operation re-reads the file under an exclusive lock so gunicorn
+    workers sharing the file see each other's changes.
+    """
+
+    def __init__(self, path: str = WATCH_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read watch store {self.path}: {e}")
+            return {}
+
+    def _write(self, data: dict):
+        # Unique temp file so a concurrent writer can never rename our partial file
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def add(self, job_id: str, number: str) -> bool:
+        """Subscribe a number to a Job ID. Returns False if it was already watching."""
+        with self._locked():
+            data = self._read()
+            entry = data.setdefault(job_id, {"subscribers": [], "created": time.time(), "last": None})
+            if number in entry["subscribers"]:
+                return False
+            entry["subscribers"].append(number)
+            self._write(data)
+            return True
+
+    def remove(self, job_id: str, number: str) -> bool:
+        """Unsubscribe a number. Returns False if it was not watching."""
+        with self._locked():
+            data = self._read()
+            entry = data.get(job_id)
+            if not entry or number not in entry["subscribers"]:
+                return False
+            entry["subscribers"].remove(number)
+            if not entry["subscribers"]:
+                del data[job_id]
+            self._write(data)
+            return True
+
+    def snapshot(self) -> dict:
+        with self._locked():
+            return self._read()
+
+    def record_check(self, job_id: str, state: dict = None):
+        """
+        Stamp a poll of the Job ID, storing its new state when given.
+        Returns the current entry, or None if nobody is watching it any more.
+        """
+        with self._locked():
+            data = self._read()
+            entry = data.get(job_id)
+            if entry:
+                entry["checked"] = time.time()
+                if state is not None:
+                    entry["last"] = state
+                self._write(data)
+            return entry
+
+    def drop(self, job_id: str):
+        """Remove a Job ID and all its subscribers; returns the removed entry, if any."""
+        with self._locked():
+            data = self._read()
+            entry = data.pop(job_id, None)
+            if entry is not None:
+                self._write(data)
+            return entry
+
+    def expire(self, ttl_hours: float = WATCH_TTL_HOURS) -> dict:
+        """Drop subscriptions older than the TTL; returns the removed entries."""
+        cutoff = time.time() - ttl_hours * 3600
+        with self._locked():
+            data = self._read()
+            expired = {job_id: entry for job_id, entry in data.items() if entry["created"] < cutoff}
+            if expired:
+                for job_id in expired:
+                    del data[job_id]
+                self._write(data)
+            return expired
+
+
+def _is_terminal(state: dict) -> bool:
+    """A passed job is done; failed jobs stay watched in case they are re-tested."""
+    return state["overall_status"] == "PASS"
+
+
+def _job_state(result: dict):
+    """The part of a lookup result that triggers a notification when it changes."""
+    if not result.get("success") or not result.get("overall_status"):
+        return None
+    return {
+        "overall_status": result["overall_status"],
+        "component_status": result.get("component_status", {})
+    }
+
+
+class WatchPoller(threading.Thread):
+    """
+    Background poller: every WATCH_POLL_INTERVAL it checks up to `batch_size`
+    watched Job IDs (least recently checked first) within WATCH_CYCLE_SECONDS,
+    one lookup at a time on an idle portal session, and messages subscribers
+    only when a job's overall_status or component_status changes. A job that
+    passes is dropped from the watch list after the notification.
+
+    Only one process polls: the leader holds an exclusive lock on
+    `<store>.poller.lock`; other workers keep retrying in case it exits.
+    """
+
+    def __init__(self, store: SubscriptionStore, interval: float = WATCH_POLL_INTERVAL,
+                 batch_size: int = WATCH_BATCH_SIZE, cycle_seconds: float = WATCH_CYCLE_SECONDS):
+        super().__init__(name="watch-poller", daemon=True)
+        self.store = store
+        self.interval = interval
+        self.batch_size = batch_size
+        self.cycle_seconds = cycle_seconds
+        self._leader_lock = None
+
+    def _is_leader(self) -> bool:
+        if self._leader_lock or not fcntl:
+            return True
+        lock_file = open(f"{self.store.path}.poller.lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._leader_lock = lock_file
+        logger.info("👀 This worker is polling watched jobs")
+        return True
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                if self._is_leader():
+                    self.poll_once()
+            except Exception:
+                logger.exception("❌ Watch poll cycle failed")
+
+    def poll_once(self):
+        for job_id, entry in self.store.expire().items():
+            for number in entry["subscribers"]:
+                self._send(number, f"⌛ Stopped watching Job ID {job_id} after {WATCH_TTL_HOURS:.0f} hours.\n\nSend \"watch {job_id}\" to keep watching.")
+
+        watched = self.store.snapshot()
+        if not watched:
+            return
+        # Least recently checked first, so a capped cycle still rotates through every watch
+        job_ids = sorted(watched, key=lambda job_id: watched[job_id].get("checked", 0))[:self.batch_size]
+        logger.info(f"👀 Polling {len(job_ids)} of {len(watched)} watched Job IDs")
+
+        results = batch_search(job_ids, budget=self.cycle_seconds)
+        if len(results) < len(job_ids):
+            logger.info(f"Watch cycle checked {len(results)} Job IDs; the rest wait for the next cycle")
+
+        for job_id, result in results.items():
+            state = _job_state(result)
+            if state is None or state == watched[job_id]["last"]:
+                self.store.record_check(job_id)
+                if state is not None and _is_terminal(state):
+                    self.store.drop(job_id)
+                continue
+
+            message = f"🔔 Update for watched Job ID {job_id}\n\n" + format_job_response(job_id, result)
+            # Subscribers as of now, not the pre-cycle snapshot: some may have unwatched meanwhile
+            if _is_terminal(state):
+                entry = self.store.drop(job_id)
+                message += "\n\n✅ This job passed, so I've stopped watching it."
+            else:
+                entry = self.store.record_check(job_id, state)
+            for number in (entry["subscribers"] if entry else []):
+                self._send(number, message)
+
+    def _send(self, number: str, message: str):
+        try:
+            send_whatsapp_message(number, message)
+        except Exception as e:
+            logger.error(f"❌ Failed to send watch update to {number}: {e}")
+
+
+subscription_store = SubscriptionStore()
+_poller = None
+
+
+def start_watch_poller():
+    """Start the background poller once per process (no-op if WATCH_POLL_INTERVAL is 0)."""
+    global _poller
+    if _poller is None and WATCH_POLL_INTERVAL > 0:
+        _poller = WatchPoller(subscription_store)
+        _poller.start()
+    return _poller
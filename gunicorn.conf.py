@@ -0,0 +1,8 @@
+# gunicorn.conf.py
+# Loaded automatically by gunicorn from the working directory.
+
+
+def post_worker_init(worker):
+    """Start the watch poller inside the worker, after the fork."""
+    from app.watch import start_watch_poller
+    start_watch_poller()
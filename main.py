@@ -1,11 +1,17 @@
 # main.py
 import os
+import hmac
 import logging
-from flask import Flask, request, jsonify
+from functools import wraps
+from flask import Flask, request, jsonify, g, Response
 from dotenv import load_dotenv
 from app.twilio_client import send_whatsapp_message
-from app.scraper import playwright_search
-from app.utils import format_job_response, handle_general_query
+from app.scraper import playwright_search, portal_breaker, session_snapshot
+from app.utils import format_job_response, handle_general_query, validate_job_id
+from app.loadgen import record_webhook
+from app.deadline import Deadline
+from app.profiler import profile_for, request_profiler
+from app.watch import subscription_store, start_watch_poller
 from datetime import datetime
 
 load_dotenv()
@@ -16,6 +22,56 @@ logger = logging.getLogger("whatsapp_veex_bot")
 
 VERIFY_TOKEN = os.getenv("VERIFY_TOKEN", "verify_token_default")
 
+# End-to-end budget per webhook call; must stay under gunicorn's --timeout 120
+WEBHOOK_DEADLINE_SECONDS = float(os.getenv("WEBHOOK_DEADLINE_SECONDS", "100"))
+# Part of the budget held back for sending the final WhatsApp reply
+SEND_RESERVE_SECONDS = float(os.getenv("SEND_RESERVE_SECONDS", "12"))
+# Longest on-demand profile; keeps the admin request under gunicorn's timeout
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+
+
+def require_verify_token(view):
+    """Guard admin routes with VERIFY_TOKEN, sent only as the X-Verify-Token header (never in URLs/logs)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if VERIFY_TOKEN == "verify_token_default":
+            return jsonify({"error": "Admin routes disabled: set VERIFY_TOKEN"}), 403
+        supplied = request.headers.get("X-Verify-Token", "")
+        if not hmac.compare_digest(supplied.encode(), VERIFY_TOKEN.encode()):
+            return jsonify({"error": "Unauthorized"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def require_single_process(need_threads: bool):
+    """
+    Profiler state lives in one process, so refuse to run under several
+    worker processes (e.g. gunicorn --workers 2). Whole-process sampling also
+    needs a threaded server, otherwise it would only sample its own sleep.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.environ.get("wsgi.multiprocess"):
+                return jsonify({"error": "Profiling needs a single worker process (gunicorn --workers 1 --threads N)"}), 409
+            if need_threads and not request.environ.get("wsgi.multithread"):
+                return jsonify({"error": "Profiling needs a threaded server (gunicorn --threads N)"}), 409
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _positive_arg(name: str, default: str, cast=float, maximum=None):
+    """Parse a strictly positive query argument; returns (value, error_response)."""
+    try:
+        value = cast(request.args.get(name, default))
+    except ValueError:
+        return None, (jsonify({"error": f"{name} must be a number"}), 400)
+    if not value > 0 or (maximum is not None and value > maximum):
+        limit = f" and at most {maximum}" if maximum is not None else ""
+        return None, (jsonify({"error": f"{name} must be greater than 0{limit}"}), 400)
+    return value, None
+
 @app.route("/", methods=["GET"])
 def home():
     """Root endpoint to verify app is running"""
@@ -30,7 +86,58 @@ def home():
 
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()}), 200
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "veex_portal": portal_breaker.snapshot(),
+        "veex_sessions": session_snapshot()
+    }), 200
+
+@app.route("/admin/profile", methods=["GET"])
+@require_verify_token
+@require_single_process(need_threads=True)
+def admin_profile():
+    """Sample the live process for ?seconds=N and return collapsed stacks."""
+    seconds, error = _positive_arg("seconds", "10", maximum=PROFILE_MAX_SECONDS)
+    if error:
+        return error
+    interval, error = _positive_arg("interval", "0.005", maximum=1.0)
+    if error:
+        return error
+    return Response(profile_for(seconds, interval), mimetype="text/plain")
+
+@app.route("/admin/profile/requests", methods=["GET", "POST"])
+@require_verify_token
+@require_single_process(need_threads=False)
+def admin_profile_requests():
+    """
+    POST ?count=K arms profiling of the next K webhook requests.
+    GET returns their merged collapsed stacks once done, else progress.
+    """
+    if request.method == "POST":
+        count, error = _positive_arg("count", "1", cast=int)
+        if error:
+            return error
+        interval, error = _positive_arg("interval", "0.005", maximum=1.0)
+        if error:
+            return error
+        if not request_profiler.arm(count, interval):
+            return jsonify({"error": "Profiled requests are still in flight; re-arm once they finish", **request_profiler.status()}), 409
+        return jsonify({"status": "armed", **request_profiler.status()}), 200
+
+    status = request_profiler.status()
+    if not status["done"]:
+        return jsonify({"status": "pending", **status}), 202
+    return Response(request_profiler.output(), mimetype="text/plain")
+
+@app.before_request
+def start_request_profile():
+    if request.endpoint == "webhook" and request.method == "POST":
+        g.profile_token = request_profiler.begin()
+
+@app.teardown_request
+def finish_request_profile(exc):
+    request_profiler.end(g.pop("profile_token", None))
 
 @app.route("/webhook", methods=["GET", "POST"])
 def webhook():
@@ -41,6 +148,11 @@ def webhook():
     if request.method == "GET":
         return jsonify({"status": "webhook_online", "service": "WhatsApp VeEX Bot"}), 200
 
+    deadline = Deadline(WEBHOOK_DEADLINE_SECONDS, stage="receive")
+
+    # Capture traffic for load-test replay when WEBHOOK_RECORD_PATH is set
+    record_webhook(request.form)
+
     # Twilio sends application/x-www-form-urlencoded by default
     from_number = request.form.get("From")  # e.g., 'whatsapp:+92300...'
     body = request.form.get("Body", "").strip()
@@ -59,32 +171,70 @@ def webhook():
         send_whatsapp_message(from_number, reply)
         return jsonify({"status": "no_body"}), 200
 
+    words = body.strip().split()
+    first_word = words[0]
+    command = first_word.lower()
+
+    # "watch <JobID>" / "unwatch <JobID>" manage background job watches
+    if command in ("watch", "unwatch"):
+        job_id = words[1] if len(words) > 1 else ""
+        is_valid, error = validate_job_id(job_id)
+        if not is_valid:
+            msg = f"❌ {error}\n\nUsage: {command} <20-digit Job ID>"
+        elif command == "watch":
+            if subscription_store.add(job_id, from_number):
+                logger.info("👀 %s is now watching Job ID %s", from_number, job_id)
+                msg = f"👀 Watching Job ID {job_id}.\n\nI'll message you when its results change. Send \"unwatch {job_id}\" to stop."
+            else:
+                msg = f"👀 You're already watching Job ID {job_id}."
+        else:
+            if subscription_store.remove(job_id, from_number):
+                msg = f"🛑 Stopped watching Job ID {job_id}."
+            else:
+                msg = f"ℹ️ You weren't watching Job ID {job_id}."
+
+        send_whatsapp_message(from_number, msg, deadline=deadline)
+        return jsonify({"status": f"{command}_complete"}), 200
+
     # Check if the message is a 20-digit Job ID
-    first_word = body.strip().split()[0]
-    
     if first_word.isdigit() and len(first_word) == 20:
         # Handle Job ID lookup
         job_id = first_word
         logger.info("🔍 Job ID detected: %s", job_id)
         
         # Send interim response
-        send_whatsapp_message(from_number, f"🔍 Searching for Job ID: {job_id}\n⏳ Please wait...")
+        deadline.stage = "send"
+        send_whatsapp_message(from_number, f"🔍 Searching for Job ID: {job_id}\n⏳ Please wait...", deadline=deadline)
 
         try:
-            job_data = playwright_search(job_id, headless=True)
+            job_data = playwright_search(job_id, headless=True, deadline=deadline.sub(SEND_RESERVE_SECONDS))
             
-            if job_data and job_data.get("success"):
+            status = "job_lookup_complete"
+            if job_data and job_data.get("partial") and job_data.get("timed_out"):
+                msg = f"⏱️ Job ID {job_id} was found on the VeEX portal, but its details could not be loaded in time.\n\nPlease try again shortly."
+                status = "job_lookup_timed_out"
+            elif job_data and job_data.get("partial"):
+                msg = f"⚠️ Job ID {job_id} was found on the VeEX portal, but its details could not be read.\n\nPlease try again or check the portal directly."
+            elif job_data and job_data.get("success"):
                 msg = format_job_response(job_id, job_data)
+            elif job_data and job_data.get("timed_out"):
+                msg = f"⏱️ Looking up Job ID {job_id} took too long (stopped during {job_data.get('stage', 'lookup')}).\n\nThe portal may be slow right now. Please try again shortly."
+                status = "job_lookup_timed_out"
+            elif job_data and job_data.get("breaker_open"):
+                msg = f"⚠️ The VeEX portal is currently unavailable, so Job ID {job_id} could not be checked.\n\nPlease try again in a few minutes."
+                status = "job_lookup_unavailable"
             else:
                 msg = f"❌ Job ID {job_id} not found or no data available.\n\nPlease check the Job ID and try again."
                 
         except Exception as exc:
             logger.exception("❌ Error fetching job info")
             msg = f"⚠️ Error fetching job data:\n{str(exc)}\n\nPlease try again later."
+            status = "error"
 
         # Send response (with chunking if needed)
-        send_whatsapp_message(from_number, msg)
-        return jsonify({"status": "job_lookup_complete"}), 200
+        deadline.stage = "send"
+        send_whatsapp_message(from_number, msg, deadline=deadline)
+        return jsonify({"status": status}), 200
     
     else:
         # Handle general conversational query
@@ -92,7 +242,7 @@ def webhook():
         
         try:
             response = handle_general_query(body)
-            send_whatsapp_message(from_number, response)
+            send_whatsapp_message(from_number, response, deadline=deadline)
             return jsonify({"status": "general_query_complete"}), 200
             
         except Exception as exc:
@@ -106,4 +256,6 @@ if __name__ == "__main__":
     # Railway uses PORT, local uses FLASK_PORT
     port = int(os.getenv("PORT", os.getenv("FLASK_PORT", 8000)))
     logger.info(f"🚀 Starting WhatsApp VeEX Bot on {host}:{port}")
+    # Background polling of watched Job IDs (gunicorn starts it from gunicorn.conf.py)
+    start_watch_poller()
     app.run(host=host, port=port, debug=False)